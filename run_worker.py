@@ -8,7 +8,7 @@ import sys
 import logging
 import tracemalloc
 from pathlib import Path
-from telegram_forwarder import main
+from telegram_forwarder import main as run_forwarder
 
 # Configure logging
 logging.basicConfig(
@@ -22,8 +22,11 @@ def setup_environment() -> None:
     # Ensure we're in the correct directory
     os.chdir(Path(__file__).parent)
     
-    # Start tracemalloc with a limit of 25 frames
-    tracemalloc.start(25)
+    # Tracing every allocation slows the bot down, so it is opt-in,
+    # e.g. TRACEMALLOC=25 to keep 25 frames per allocation
+    frames = int(os.getenv('TRACEMALLOC', '0'))
+    if frames > 0:
+        tracemalloc.start(frames)
 
 def cleanup_environment() -> None:
     """Clean up resources."""
@@ -34,7 +37,7 @@ def main() -> None:
     """Main entry point for the worker."""
     try:
         setup_environment()
-        main()
+        run_forwarder()
     except KeyboardInterrupt:
         logger.info("Bot stopped by user")
         sys.exit(0)
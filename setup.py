@@ -33,6 +33,5 @@ setup(
     install_requires=[
         "python-telegram-bot==20.7",
         "python-dotenv==1.0.0",
-        "nest-asyncio==1.6.0",
     ],
 ) 
\ No newline at end of file
@@ -0,0 +1,157 @@
+"""
+Startup benchmark for the Telegram bot.
+Measures import time and time-to-first-update of fresh processes against a mock bot.
+
+Usage:
+    python -m telegram_forwarder.benchmark --runs 5 --latency 50 --warm
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import statistics
+import subprocess
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, List
+
+async def _first_update(latency: float) -> float:
+    """Start the bot against a mock bot and wait until the first update was handled."""
+    from telegram import Update
+    from telegram.ext import ContextTypes, TypeHandler
+
+    from .bot import create_application, start_bot
+    from .replay import MockBotRequest
+    from .utils.config import config_manager
+    from .utils.state import warm_state
+
+    class StartupRequest(MockBotRequest):
+        """Mock bot that delivers one update and then long-polls forever."""
+
+        def __init__(self, latency: float):
+            super().__init__(latency=latency)
+            self.delivered = False
+
+        def _result(self, endpoint: str, params: Dict[str, Any]) -> Any:
+            if endpoint == 'getUpdates' and not self.delivered:
+                self.delivered = True
+                return [{
+                    'update_id': (warm_state.update_offset or 1),
+                    'message': {
+                        'message_id': 1,
+                        'date': int(time.time()),
+                        'chat': {'id': -100, 'type': 'group', 'title': 'Benchmark'},
+                        'text': 'hello',
+                    },
+                }]
+            return super()._result(endpoint, params)
+
+        async def do_request(self, url: str, method: str, request_data=None, **kwargs):
+            long_poll = request_data and request_data.parameters.get('timeout')
+            if url.endswith('/getUpdates') and self.delivered and long_poll:
+                await asyncio.sleep(3600)
+            return await super().do_request(url, method, request_data, **kwargs)
+
+    handled = asyncio.Event()
+
+    async def mark_handled(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        handled.set()
+
+    config_manager.load()
+    warm_state.load()
+    application = create_application(request=StartupRequest(latency))
+    application.add_handler(TypeHandler(Update, mark_handled), group=100)
+
+    poller = await start_bot(application)
+    await handled.wait()
+    first_update = time.perf_counter()
+
+    await poller.stop()
+    await application.stop()
+    await application.shutdown()
+    return first_update
+
+def run_child(latency: float) -> None:
+    """Measure one startup in this process and print the results as JSON."""
+    started = time.perf_counter()
+    from . import bot  # noqa: F401
+    imported = time.perf_counter()
+    first_update = asyncio.run(_first_update(latency))
+    print(json.dumps({
+        'import': imported - started,
+        'first_update': first_update - started,
+    }))
+
+def run_once(latency: float, warm: bool) -> Dict[str, float]:
+    """
+    Start a fresh process and measure its startup.
+
+    Args:
+        latency: Seconds every mock Bot API call takes
+        warm: Whether to start from a warm state snapshot
+
+    Returns:
+        Dict[str, float]: Process, import and time-to-first-update timings in seconds
+    """
+    with tempfile.TemporaryDirectory(prefix='benchmark-') as tmp_dir:
+        state_file = Path(tmp_dir) / 'state.json'
+        if warm:
+            state_file.write_text(json.dumps({'update_offset': 1000}))
+
+        env = dict(os.environ)
+        env.setdefault('BOT_TOKEN', '0:benchmark')
+        env['STATE_FILE'] = str(state_file)
+        env.pop('RECORD_UPDATES', None)
+        env.pop('HEALTH_PORT', None)
+
+        started = time.perf_counter()
+        output = subprocess.run(
+            [
+                sys.executable, '-m', 'telegram_forwarder.benchmark',
+                '--child', '--latency', str(latency * 1000)
+            ],
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True
+        ).stdout
+        total = time.perf_counter() - started
+
+    result = json.loads(output.strip().splitlines()[-1])
+    result['process'] = total
+    return result
+
+def print_report(results: List[Dict[str, float]]) -> None:
+    """Print the median and best timings of all runs."""
+    labels = {
+        'import': 'Import time',
+        'first_update': 'Time to first update',
+        'process': 'Process wall time',
+    }
+    for key, label in labels.items():
+        values = [result[key] * 1000 for result in results]
+        print(f"{label + ':':<22} median {statistics.median(values):7.1f}ms, best {min(values):7.1f}ms")
+
+def main() -> None:
+    """Main entry point for the startup benchmark."""
+    parser = argparse.ArgumentParser(description="Measure bot startup against a mock bot.")
+    parser.add_argument('--runs', type=int, default=5, help="Number of fresh processes (default: 5)")
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help="Milliseconds every mock Bot API call takes (default: 0)")
+    parser.add_argument('--warm', action='store_true', help="Start from a warm state snapshot")
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.latency / 1000)
+        return
+
+    results = [run_once(args.latency / 1000, args.warm) for _ in range(args.runs)]
+    print(f"{args.runs} {'warm' if args.warm else 'cold'} starts, {args.latency:.0f}ms mock API latency")
+    print_report(results)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""
+Bot application setup for the Telegram bot.
+Handles handler registration, startup and the main run loop.
+"""
+
+import logging
+import os
+import asyncio
+import signal
+from typing import Optional
+
+from telegram.ext import (
+    Application,
+    CommandHandler,
+    MessageHandler,
+    CallbackQueryHandler,
+    filters
+)
+from telegram.request import BaseRequest, HTTPXRequest
+
+from .utils.config import config_manager
+from .utils.state import warm_state
+from .utils.spill import spill_file
+from .utils.scheduler import create_update_processor
+from .utils.recorder import RecordingRequest, create_recorder
+from .utils.monitor import create_monitor, create_health_server
+from .utils.poller import AdaptivePoller, create_poller
+from .utils.lifecycle import resume_pending, drain_application
+from .utils.transform import transform_stage
+from .handlers.commands import start, help_command, set_source, set_dest, status
+from .handlers.callbacks import button_handler
+from .handlers.messages import handle_message
+
+logger = logging.getLogger(__name__)
+
+def get_bot_token() -> str:
+    """Get the bot token from environment variables."""
+    token = os.getenv('BOT_TOKEN')
+    if not token:
+        raise ValueError("No BOT_TOKEN found in environment variables")
+    return token
+
+def create_application(request: Optional[BaseRequest] = None) -> Application:
+    """
+    Create and configure the bot application with all handlers.
+    
+    Args:
+        request: Request used for all Bot API calls instead of the default
+            HTTP client, e.g. a mock bot for replays
+    """
+    builder = (
+        Application.builder()
+        .token(get_bot_token())
+        .concurrent_updates(create_update_processor())
+        .updater(None)
+    )
+    if request:
+        builder = builder.request(request).get_updates_request(request)
+    else:
+        # Create application with optimized settings
+        builder = (
+            builder
+            .connect_timeout(30.0)
+            .read_timeout(30.0)
+            .write_timeout(30.0)
+            .pool_timeout(30.0)
+        )
+        recorder = create_recorder()
+        if recorder:
+            builder = builder.get_updates_request(RecordingRequest(HTTPXRequest(), recorder))
+    application = builder.build()
+
+    # Register command handlers
+    command_handlers = {
+        "start": start,
+        "help": help_command,
+        "setsource": set_source,
+        "setdest": set_dest,
+        "status": status
+    }
+    for command, handler in command_handlers.items():
+        application.add_handler(CommandHandler(command, handler))
+
+    # Register other handlers
+    application.add_handler(CallbackQueryHandler(button_handler))
+    application.add_handler(MessageHandler(filters.ALL, handle_message))
+
+    return application
+
+async def start_bot(application: Application) -> AdaptivePoller:
+    """
+    Start the application from the last snapshot and begin polling.
+
+    Args:
+        application: The bot application
+
+    Returns:
+        AdaptivePoller: The running poller
+    """
+    await application.initialize()
+    await application.start()
+    await resume_pending(application)
+
+    poller = create_poller(application)
+    await poller.start(drop_pending_updates=warm_state.update_offset is None)
+    return poller
+
+async def run_bot() -> None:
+    """Run the bot with proper error handling and signal management."""
+    application: Optional[Application] = None
+    poller: Optional[AdaptivePoller] = None
+    stop_event = asyncio.Event()
+    monitor = create_monitor()
+    health_server = None
+
+    def handle_shutdown() -> None:
+        """Handle shutdown signals gracefully."""
+        logger.info("Received shutdown signal")
+        stop_event.set()
+
+    try:
+        # Load config and the last snapshot once
+        config_manager.load()
+        warm_state.load()
+        spill_file.load()
+
+        # Initialize application
+        application = create_application()
+        logger.info("Starting bot...")
+
+        # Set up signal handlers
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(sig, handle_shutdown)
+
+        monitor.start()
+        health_server = create_health_server(application, monitor)
+        if health_server:
+            health_server.start()
+
+        # Run polling until a shutdown signal arrives
+        poller = await start_bot(application)
+        if health_server:
+            health_server.poller = poller
+        await stop_event.wait()
+
+    except Exception as e:
+        logger.error(f"Error running bot: {str(e)}")
+        raise
+    finally:
+        if application:
+            await drain_application(application, poller)
+        await transform_stage.shutdown()
+        if health_server:
+            await health_server.stop()
+        await monitor.stop()
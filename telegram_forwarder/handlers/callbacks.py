@@ -8,6 +8,7 @@ from typing import Optional, Tuple
 from telegram import Update, Chat
 from telegram.ext import ContextTypes
 from ..utils.config import config, save_config
+from ..utils.state import warm_state
 from .commands import status, help_command
 
 logger = logging.getLogger(__name__)
@@ -28,6 +29,7 @@ async def handle_channel_setting(
     try:
         chat_id = int(query.data.split('_')[2])
         chat = await context.bot.get_chat(chat_id)
+        warm_state.cache_chat_title(chat_id, chat.title)
         config[f'{channel_type}_channel'] = chat_id
         save_config(config)
         await query.message.edit_text(
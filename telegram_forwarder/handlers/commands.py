@@ -9,6 +9,7 @@ from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, Chat
 from telegram.ext import ContextTypes
 from telegram.constants import ChatType
 from ..utils.config import config, save_config
+from ..utils.state import warm_state
 
 logger = logging.getLogger(__name__)
 
@@ -53,10 +54,17 @@ async def get_chat_info(bot, chat_id: int) -> str:
     Returns:
         str: Formatted chat information
     """
+    title = warm_state.get_chat_title(chat_id)
+    if title:
+        return f"📢 {title}\nID: {chat_id}"
+
     try:
         chat = await bot.get_chat(chat_id)
+        warm_state.cache_chat_title(chat_id, chat.title)
         return f"📢 {chat.title}\nID: {chat_id}"
     except Exception as e:
+        # Show the ID only, it tells the user the bot lost access
+        warm_state.forget_chat(chat_id)
         logger.error(f"Error getting chat info: {str(e)}")
         return f"ID: {chat_id}"
 
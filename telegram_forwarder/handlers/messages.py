@@ -3,12 +3,18 @@ Message handler for the Telegram bot.
 Handles message processing, bot mentions, and message forwarding.
 """
 
+import time
 import logging
+from functools import partial
 from typing import Optional, List
 from telegram import Update, Message, User
 from telegram.ext import ContextTypes
 from telegram.constants import ChatType
+from telegram.error import BadRequest, Forbidden
 from ..utils.config import config, save_config
+from ..utils.state import warm_state
+from ..utils.metrics import metrics
+from ..utils.transform import get_route, transform_stage
 
 logger = logging.getLogger(__name__)
 
@@ -91,16 +97,102 @@ async def forward_message(message: Message, context: ContextTypes.DEFAULT_TYPE)
         message: The message to forward
         context: The context object
     """
+    await copy_to_destination(
+        context.bot,
+        chat_id=config['destination_channel'],
+        from_chat_id=message.chat_id,
+        message_id=message.message_id,
+        message=message
+    )
+
+def finish_forward(
+    from_chat_id: int,
+    message_id: int,
+    error: Optional[Exception] = None,
+    resumed: bool = False
+) -> None:
+    """
+    Record the outcome of a forward in the warm state.
+    
+    Args:
+        from_chat_id: The source chat ID
+        message_id: The source message ID
+        error: The error the forward failed with, None if it was sent
+        resumed: Whether the forward was resent from the last snapshot
+    """
+    if error is None:
+        warm_state.complete_forward(from_chat_id, message_id)
+        metrics.set('last_forward_at', time.time())
+        metrics.inc('forwards')
+        logger.info(f"Message {message_id} forwarded successfully")
+    elif resumed and not isinstance(error, (BadRequest, Forbidden)):
+        logger.warning(f"Error resending message {message_id}, keeping it pending: {str(error)}")
+    else:
+        warm_state.abandon_forward(from_chat_id, message_id)
+        logger.error(f"Error forwarding message: {str(error)}")
+
+async def copy_to_destination(
+    bot,
+    chat_id: int,
+    from_chat_id: int,
+    message_id: int,
+    message: Optional[Message] = None,
+    resumed: bool = False
+) -> None:
+    """
+    Copy a message to a chat, tracking it in the warm state.
+    
+    If the chat has a transform route and the message is given, the copy is
+    queued in the transform stage, which sends a transformed copy where the
+    route applies and returns before it is sent. Forwards that are
+    interrupted by shutdown stay pending in the warm state and are resent on
+    the next start.
+    
+    Args:
+        bot: The bot instance
+        chat_id: The destination chat ID
+        from_chat_id: The source chat ID
+        message_id: The source message ID
+        message: The source message, needed for transform routes
+        resumed: Whether the forward is resent from the last snapshot. Resent
+            forwards that fail for other reasons than a rejected request stay
+            pending for the next start
+    """
+    if warm_state.is_forwarded(from_chat_id, message_id):
+        warm_state.abandon_forward(from_chat_id, message_id)
+        logger.info(f"Message {message_id} skipped (already forwarded)")
+        return
+
+    route = get_route(chat_id)
+    transform = bool(route and message and route.applies_to(message))
+    warm_state.begin_forward(
+        chat_id,
+        from_chat_id,
+        message_id,
+        message=message.to_dict() if transform else None
+    )
+
+    # Copies to transform routes all go through the stage to keep their order
+    if route and message:
+        await transform_stage.submit(
+            bot,
+            chat_id,
+            message,
+            route,
+            on_done=partial(finish_forward, from_chat_id, message_id, resumed=resumed)
+        )
+        return
+
     try:
-        await context.bot.copy_message(
-            chat_id=config['destination_channel'],
-            from_chat_id=message.chat_id,
-            message_id=message.message_id
+        await bot.copy_message(
+            chat_id=chat_id,
+            from_chat_id=from_chat_id,
+            message_id=message_id
         )
-        logger.info(f"Message {message.message_id} forwarded successfully")
     except Exception as e:
-        logger.error(f"Error forwarding message: {str(e)}")
+        finish_forward(from_chat_id, message_id, e, resumed)
         raise
+    finish_forward(from_chat_id, message_id)
 
 async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """
@@ -0,0 +1,413 @@
+"""
+Replayer for recorded update traffic.
+Feeds a recording through the bot application against a mock bot and reports
+throughput, latency and forwarding decisions.
+
+Usage:
+    python -m telegram_forwarder.replay updates.jsonl.gz --speed max --source -1001 --dest -1002
+"""
+
+import io
+import json
+import time
+import asyncio
+import logging
+import argparse
+import tempfile
+from collections import Counter, deque
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+import httpx
+from telegram import Update
+from telegram.ext import ContextTypes, TypeHandler
+from telegram.request import BaseRequest, RequestData
+
+from .bot import create_application
+from .utils.config import config, config_manager
+from .utils.state import warm_state
+from .utils.spill import spill_file
+from .utils.poller import create_poller
+from .utils.recorder import read_recording
+from .utils.transform import transform_stage
+
+logger = logging.getLogger(__name__)
+
+# Bot API calls that send a copy of a source message
+FORWARDING_CALLS = ('copyMessage', 'sendPhoto')
+
+# ID of the update processed by the current task, recorded with every Bot API call
+current_update: ContextVar[Optional[int]] = ContextVar('current_update', default=None)
+
+class MockBotRequest(BaseRequest):
+    """
+    Request that answers Bot API calls locally and records them with the update that made them.
+
+    getUpdates is answered from the updates released with release, like
+    Telegram would: confirmed updates are forgotten and long polls wait for
+    the next release.
+    """
+
+    def __init__(self, latency: float = 0.0, bot_username: str = 'replay_bot'):
+        """
+        Initialize the mock bot.
+
+        Args:
+            latency: Seconds every call takes
+            bot_username: Username reported by getMe
+        """
+        self.latency = latency
+        self.bot_username = bot_username
+        self.calls: List[Tuple[str, Dict[str, Any], Optional[int]]] = []
+        self._message_id = 0
+        self._image: Optional[bytes] = None
+        self._updates: Deque[Dict[str, Any]] = deque()
+        self._released = asyncio.Event()
+
+    @property
+    def read_timeout(self) -> Optional[float]:
+        """No timeouts apply to the mock bot."""
+        return None
+
+    async def initialize(self) -> None:
+        """Nothing to set up."""
+
+    async def shutdown(self) -> None:
+        """Nothing to clean up."""
+
+    def release(self, update: Dict[str, Any]) -> None:
+        """
+        Make an update available to getUpdates.
+
+        Args:
+            update: The raw update
+        """
+        self._updates.append(update)
+        self._released.set()
+
+    async def _wait_for_updates(self, params: Dict[str, Any]) -> None:
+        """Drop confirmed updates and wait up to the long-poll timeout for new ones."""
+        offset = params.get('offset')
+        if offset is not None:
+            while self._updates and self._updates[0]['update_id'] < offset:
+                self._updates.popleft()
+        if self._updates or not params.get('timeout'):
+            # Give the event loop a turn, like a real request would
+            await asyncio.sleep(0)
+            return
+        self._released.clear()
+        try:
+            await asyncio.wait_for(self._released.wait(), timeout=params['timeout'])
+        except asyncio.TimeoutError:
+            pass
+
+    def _next_message(self, chat_id: Any, text: Optional[str] = None) -> Dict[str, Any]:
+        """Build a sent message for the given chat."""
+        self._message_id += 1
+        return {
+            'message_id': self._message_id,
+            'date': int(time.time()),
+            'chat': {'id': chat_id if isinstance(chat_id, int) else 0, 'type': 'private'},
+            'text': text,
+        }
+
+    def _result(self, endpoint: str, params: Dict[str, Any]) -> Any:
+        """Build the result of a Bot API call."""
+        if endpoint == 'getMe':
+            return {
+                'id': 1,
+                'is_bot': True,
+                'first_name': 'Replay',
+                'username': self.bot_username,
+            }
+        if endpoint == 'getChat':
+            chat_id = params.get('chat_id')
+            return {
+                'id': chat_id if isinstance(chat_id, int) else 0,
+                'type': 'channel',
+                'title': f"Chat {chat_id}",
+            }
+        if endpoint == 'getUpdates':
+            limit = params.get('limit') or 100
+            return [update for _, update in zip(range(limit), self._updates)]
+        if endpoint == 'getFile':
+            file_id = params.get('file_id')
+            return {
+                'file_id': file_id,
+                'file_unique_id': file_id,
+                'file_path': f"photos/{file_id}.jpg",
+            }
+        if endpoint == 'copyMessage':
+            return self._next_message(params.get('chat_id'))
+        if endpoint in ('sendMessage', 'editMessageText'):
+            return self._next_message(params.get('chat_id'), params.get('text'))
+        if endpoint == 'sendPhoto':
+            message = self._next_message(params.get('chat_id'))
+            message['photo'] = [{
+                'file_id': f"replay-{self._message_id}",
+                'file_unique_id': f"replay-{self._message_id}",
+                'width': 1,
+                'height': 1,
+            }]
+            return message
+        return True
+
+    def _placeholder_image(self) -> bytes:
+        """Build the JPEG served for every download, empty if Pillow is missing."""
+        if self._image is None:
+            try:
+                from PIL import Image
+            except ImportError:
+                self._image = b''
+            else:
+                buffer = io.BytesIO()
+                Image.new('RGB', (640, 480), (128, 128, 128)).save(buffer, 'JPEG')
+                self._image = buffer.getvalue()
+        return self._image
+
+    def download_transport(self) -> httpx.AsyncBaseTransport:
+        """Get an HTTP transport that answers file downloads with a placeholder image."""
+        def handle(request: httpx.Request) -> httpx.Response:
+            self.calls.append(('download', {'url': str(request.url)}, current_update.get()))
+            return httpx.Response(200, content=self._placeholder_image())
+
+        return httpx.MockTransport(handle)
+
+    async def do_request(
+        self,
+        url: str,
+        method: str,
+        request_data: Optional[RequestData] = None,
+        read_timeout=BaseRequest.DEFAULT_NONE,
+        write_timeout=BaseRequest.DEFAULT_NONE,
+        connect_timeout=BaseRequest.DEFAULT_NONE,
+        pool_timeout=BaseRequest.DEFAULT_NONE
+    ) -> Tuple[int, bytes]:
+        """Answer a Bot API call."""
+        endpoint = url.rsplit('/', 1)[-1]
+        params = request_data.parameters if request_data else {}
+        self.calls.append((endpoint, params, current_update.get()))
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if endpoint == 'getUpdates':
+            await self._wait_for_updates(params)
+        body = {'ok': True, 'result': self._result(endpoint, params)}
+        return 200, json.dumps(body).encode('utf-8')
+
+def percentile(values: List[float], pct: float) -> float:
+    """
+    Get a percentile using the nearest-rank method.
+
+    Args:
+        values: The sorted values
+        pct: The percentile between 0 and 100
+
+    Returns:
+        float: The percentile, 0 if there are no values
+    """
+    if not values:
+        return 0.0
+    rank = max(0, min(len(values) - 1, int(round(pct / 100 * len(values))) - 1))
+    return values[rank]
+
+def forwarding_decisions(
+    records: List[Tuple[float, Dict[str, Any]]],
+    calls: List[Tuple[str, Dict[str, Any], Optional[int]]]
+) -> Dict[str, List[Any]]:
+    """
+    Map every replayed update to the chats it made the bot copy a message to.
+
+    Args:
+        records: The replayed recording
+        calls: The Bot API calls made during the replay, with the update that made them
+
+    Returns:
+        Dict[str, List[Any]]: Destination chat IDs by update ID
+    """
+    decisions: Dict[str, List[Any]] = {str(data['update_id']): [] for _, data in records}
+    for endpoint, params, update_id in calls:
+        if endpoint not in FORWARDING_CALLS or update_id is None:
+            continue
+        decisions.setdefault(str(update_id), []).append(params.get('chat_id'))
+    return decisions
+
+async def replay(
+    records: List[Tuple[float, Dict[str, Any]]],
+    speed: Optional[float],
+    request: MockBotRequest,
+    drain_timeout: float = 60.0
+) -> Dict[str, Any]:
+    """
+    Feed recorded updates through the poller and the application.
+
+    Args:
+        records: The recording to replay
+        speed: Multiple of the recorded pace, None for maximum speed
+        request: The mock bot to run against
+        drain_timeout: Seconds to wait for processing after the last update
+
+    Returns:
+        Dict[str, Any]: Counters and processing latencies of the replay
+    """
+    application = create_application(request=request)
+    transform_stage.transport = request.download_transport()
+    released: Dict[int, float] = {}
+    latencies: List[float] = []
+    done = asyncio.Event()
+    finished = 0.0
+
+    async def mark_done(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        """Record when the last handler finished with an update."""
+        nonlocal finished
+        started = released.pop(update.update_id, None)
+        if started is not None:
+            finished = time.perf_counter()
+            latencies.append(finished - started)
+        if not released:
+            done.set()
+
+    async def mark_current(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        """Attribute the Bot API calls of the following handlers to the update."""
+        current_update.set(update.update_id)
+
+    application.add_handler(TypeHandler(Update, mark_current), group=-1)
+    application.add_handler(TypeHandler(Update, mark_done), group=100)
+
+    await application.initialize()
+    await application.start()
+    poller = create_poller(application)
+    await poller.start()
+
+    first_received = records[0][0] if records else 0.0
+    started = time.perf_counter()
+    for received_at, data in records:
+        if speed:
+            delay = (received_at - first_received) / speed - (time.perf_counter() - started)
+            if delay > 0:
+                await asyncio.sleep(delay)
+        released[data['update_id']] = time.perf_counter()
+        done.clear()
+        request.release(data)
+
+    if released:
+        try:
+            await asyncio.wait_for(done.wait(), timeout=drain_timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"{len(released)} updates still unprocessed after {drain_timeout}s")
+
+    # Copies still in the transform stage complete after their handlers
+    if transform_stage.pending:
+        await transform_stage.join()
+        finished = time.perf_counter()
+    elapsed = max(0.0, finished - started)
+
+    await poller.stop()
+    await application.stop()
+    await application.shutdown()
+    await transform_stage.shutdown()
+    spill_file.close()
+
+    return {
+        'updates': len(records),
+        'processed': len(latencies),
+        'elapsed': elapsed,
+        'latencies': sorted(latencies),
+        'calls': Counter(endpoint for endpoint, _, _ in request.calls),
+    }
+
+def print_report(result: Dict[str, Any], decisions: Dict[str, List[Any]]) -> None:
+    """Print the throughput, latency and call summary of a replay."""
+    latencies = result['latencies']
+    elapsed = result['elapsed']
+    print(f"Updates:     {result['updates']} replayed, {result['processed']} processed")
+    print(f"Elapsed:     {elapsed:.3f}s")
+    print(f"Throughput:  {result['processed'] / elapsed if elapsed else 0:.1f} updates/s")
+    print(
+        "Latency:     "
+        f"p50 {percentile(latencies, 50) * 1000:.1f}ms, "
+        f"p90 {percentile(latencies, 90) * 1000:.1f}ms, "
+        f"p99 {percentile(latencies, 99) * 1000:.1f}ms, "
+        f"max {(latencies[-1] if latencies else 0) * 1000:.1f}ms"
+    )
+    print(f"Forwarded:   {sum(1 for chats in decisions.values() if chats)} updates")
+    for endpoint, count in sorted(result['calls'].items()):
+        print(f"API call:    {endpoint} x{count}")
+
+def diff_decisions(baseline: Dict[str, List[Any]], decisions: Dict[str, List[Any]]) -> int:
+    """
+    Print the updates whose forwarding decision differs from a baseline.
+
+    Args:
+        baseline: Decisions of an earlier replay
+        decisions: Decisions of this replay
+
+    Returns:
+        int: Number of differing updates
+    """
+    differences = [
+        update_id for update_id in sorted(set(baseline) | set(decisions), key=int)
+        if baseline.get(update_id) != decisions.get(update_id)
+    ]
+    print(f"Decision diff: {len(differences)} updates differ from baseline")
+    for update_id in differences[:50]:
+        print(f"  update {update_id}: {baseline.get(update_id)} -> {decisions.get(update_id)}")
+    if len(differences) > 50:
+        print(f"  ... and {len(differences) - 50} more")
+    return len(differences)
+
+def parse_speed(value: str) -> Optional[float]:
+    """Parse the replay speed, 'max' meaning no delays."""
+    if value == 'max':
+        return None
+    speed = float(value.rstrip('x'))
+    if speed <= 0:
+        raise argparse.ArgumentTypeError("speed must be positive or 'max'")
+    return speed
+
+def main() -> None:
+    """Main entry point for the replayer."""
+    parser = argparse.ArgumentParser(description="Replay recorded updates against a mock bot.")
+    parser.add_argument('recording', help="Recording written with RECORD_UPDATES")
+    parser.add_argument('--speed', type=parse_speed, default=1.0,
+                        help="Multiple of the recorded pace, or 'max' (default: 1)")
+    parser.add_argument('--source', type=int, help="Source channel ID (default: from config)")
+    parser.add_argument('--dest', type=int, help="Destination channel ID (default: from config)")
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help="Milliseconds every mock Bot API call takes (default: 0)")
+    parser.add_argument('--bot-username', default='replay_bot',
+                        help="Username of the mock bot, for recorded mentions")
+    parser.add_argument('--save-decisions', help="Write forwarding decisions to this JSON file")
+    parser.add_argument('--baseline', help="Compare forwarding decisions with this JSON file")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    records = list(read_recording(args.recording))
+
+    # Keep the replay away from the real config and warm state
+    config_manager.load()
+    scratch = Path(tempfile.mkdtemp(prefix='replay-'))
+    config_manager.config_file = scratch / 'config.json'
+    warm_state.state_file = scratch / 'state.json'
+    spill_file.path = scratch / 'spill.jsonl'
+    if args.source is not None:
+        config['source_channel'] = args.source
+    if args.dest is not None:
+        config['destination_channel'] = args.dest
+
+    request = MockBotRequest(latency=args.latency / 1000, bot_username=args.bot_username)
+    result = asyncio.run(replay(records, args.speed, request))
+    decisions = forwarding_decisions(records, request.calls)
+    print_report(result, decisions)
+
+    if args.save_decisions:
+        with open(args.save_decisions, 'w') as f:
+            json.dump(decisions, f, indent=4)
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+        if diff_decisions(baseline, decisions):
+            raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,7 @@ Handles loading and saving of bot configuration and environment variables.
 """
 
 import os
+import copy
 import json
 import logging
 from typing import Dict, Any, Optional
@@ -27,31 +28,45 @@ class ConfigManager:
         """
         Initialize the configuration manager.
         
+        The configuration file is not read until load is called.
+        
         Args:
             config_file: Path to the configuration file
         """
         self.config_file = Path(config_file)
         self._config: Dict[str, Any] = {}
+        # Contents of the file as last read or written, None if it could not be read
+        self._saved: Optional[Dict[str, Any]] = None
+        self._loaded = False
+    
+    def load(self) -> None:
+        """Load configuration from file and validate the environment, once."""
+        if self._loaded:
+            return
         self._load_config()
         self._validate_environment()
+        self._loaded = True
     
     def _load_config(self) -> None:
         """Load configuration from file."""
+        # Update in place, the config dict is shared with the handlers
+        self._config.clear()
         try:
             if self.config_file.exists():
                 with open(self.config_file, 'r') as f:
-                    self._config = json.load(f)
-            else:
-                self._config = {}
+                    self._config.update(json.load(f))
+            self._saved = copy.deepcopy(self._config)
         except Exception as e:
             logger.error(f"Error loading config: {str(e)}")
-            self._config = {}
+            self._config.clear()
+            self._saved = None
     
     def _save_config(self) -> None:
         """Save configuration to file."""
         try:
             with open(self.config_file, 'w') as f:
                 json.dump(self._config, f, indent=4)
+            self._saved = copy.deepcopy(self._config)
         except Exception as e:
             logger.error(f"Error saving config: {str(e)}")
             raise ConfigError(f"Failed to save config: {str(e)}")
@@ -97,6 +112,19 @@ class ConfigManager:
             del self._config[key]
             self._save_config()
     
+    def flush(self) -> None:
+        """
+        Write the configuration to file if it changed since it was loaded or saved.
+        
+        Nothing is written if the file could not be loaded, so an unreadable
+        file is never replaced by an empty configuration.
+        """
+        if self._saved is None:
+            logger.warning("Not flushing config, the config file could not be loaded")
+            return
+        if self._config != self._saved:
+            self._save_config()
+    
     @property
     def token(self) -> str:
         """Get the bot token from environment variables."""
@@ -0,0 +1,159 @@
+"""
+Lifecycle helpers for the Telegram bot.
+Handles warm restarts on startup and the drain phase on shutdown.
+"""
+
+import os
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional
+
+from telegram import Message, Update
+from telegram.ext import Application
+
+from .config import config_manager
+from .state import warm_state
+from .spill import spill_file
+from .scheduler import PriorityUpdateProcessor
+from .poller import AdaptivePoller
+from .transform import transform_stage
+from ..handlers.messages import copy_to_destination
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Heroku sends SIGKILL 30 seconds after SIGTERM
+DRAIN_TIMEOUT = float(os.getenv('DRAIN_TIMEOUT', '25'))
+
+async def resume_pending(application: Application) -> None:
+    """
+    Resend forwards left over from the last shutdown.
+
+    Must be called after the application was started. The snapshot is saved
+    again afterwards, so a crash does not make the next start repeat them.
+    Updates left over are requeued by the poller as the bulk lane has room.
+
+    Args:
+        application: The bot application
+    """
+    for forward in warm_state.pending_forwards():
+        forward = dict(forward)
+        if 'message' in forward:
+            forward['message'] = Message.de_json(forward['message'], application.bot)
+        try:
+            await copy_to_destination(application.bot, resumed=True, **forward)
+        except Exception as e:
+            logger.error(f"Error resuming forward: {str(e)}")
+
+    if warm_state.pending_updates:
+        logger.info(f"{len(warm_state.pending_updates)} updates from last shutdown will be requeued")
+    warm_state.save()
+
+def collect_unprocessed(application: Application) -> List[Dict[str, Any]]:
+    """
+    Take the updates that were received but not processed yet out of the queues.
+
+    The taken updates will not be processed by the application anymore.
+
+    Args:
+        application: The bot application
+
+    Returns:
+        List[Dict[str, Any]]: The serialized updates
+    """
+    items = []
+    processor = application.update_processor
+    if isinstance(processor, PriorityUpdateProcessor):
+        items.extend(processor.queued_updates())
+        processor.cancel_queued()
+
+    queue = application.update_queue
+    signals = []
+    while not queue.empty():
+        item = queue.get_nowait()
+        queue.task_done()
+        if isinstance(item, Update):
+            items.append(item)
+        else:
+            signals.append(item)
+
+    updates = [item.to_dict() for item in items if isinstance(item, Update)]
+
+    # Put back the stop signal so the application can finish
+    for item in signals:
+        queue.put_nowait(item)
+
+    return updates
+
+async def drain_application(
+    application: Application,
+    poller: Optional[AdaptivePoller] = None,
+    timeout: float = DRAIN_TIMEOUT
+) -> None:
+    """
+    Shut down the application without losing in-flight work.
+
+    Stops intake, gives queued updates and in-flight sends until the deadline
+    to finish, then persists whatever is left together with the config and
+    the warm state. Every step that talks to Telegram shares the deadline.
+
+    Args:
+        application: The bot application
+        poller: The poller feeding the application
+        timeout: Seconds until the warm state has to be saved
+    """
+    logger.info(f"Draining (deadline {timeout:.0f}s)...")
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+
+    def remaining() -> float:
+        """Get the seconds left until the deadline."""
+        return max(0.0, deadline - loop.time())
+
+    # Stop intake
+    if poller and poller.running:
+        try:
+            await asyncio.wait_for(poller.stop(), timeout=remaining())
+        except asyncio.TimeoutError:
+            logger.warning("Drain deadline reached while stopping the poller")
+        except Exception as e:
+            logger.error(f"Error stopping poller: {str(e)}")
+
+    # Finish in-flight work within the deadline
+    if application.running:
+        stop_task = asyncio.create_task(application.stop())
+        done, _ = await asyncio.wait({stop_task}, timeout=remaining())
+        if not done:
+            # Queued updates are older than the spilled ones
+            warm_state.pending_updates[:0] = collect_unprocessed(application)
+            logger.warning(
+                f"Drain deadline reached, persisting {len(warm_state.pending_updates)} "
+                f"pending updates and {len(warm_state.pending_forwards())} in-flight forwards"
+            )
+            stop_task.cancel()
+        elif stop_task.exception():
+            logger.error(f"Error stopping application: {str(stop_task.exception())}")
+
+    # Send the copies still queued in the transform stage
+    try:
+        await asyncio.wait_for(transform_stage.join(), timeout=remaining())
+    except asyncio.TimeoutError:
+        logger.warning("Drain deadline reached, persisting queued transforms")
+        await transform_stage.cancel()
+
+    # Flush config, snapshot warm state and close the spill file
+    try:
+        config_manager.flush()
+    except Exception as e:
+        logger.error(f"Error flushing config: {str(e)}")
+    warm_state.save()
+    spill_file.close()
+
+    try:
+        await asyncio.wait_for(application.shutdown(), timeout=remaining())
+    except asyncio.TimeoutError:
+        logger.warning("Drain deadline reached while shutting down the application")
+    except Exception as e:
+        logger.error(f"Error shutting down application: {str(e)}")
+
+    logger.info("Drain complete")
@@ -0,0 +1,62 @@
+"""
+Media transforms for the Telegram bot.
+Handles the transforms run in the worker processes, without importing telegram or httpx.
+"""
+
+from typing import Any, Callable, Dict
+
+class TransformError(Exception):
+    """Raised when a media transformation fails."""
+    pass
+
+def watermark(input_path: str, output_path: str, options: Dict[str, Any]) -> None:
+    """
+    Draw a text watermark in the bottom right corner of an image.
+
+    Runs in a worker process. Requires Pillow.
+
+    Args:
+        input_path: Path to the original image
+        output_path: Path to write the watermarked JPEG to
+        options: 'text' to draw, 'opacity' between 0 and 255, 'margin' in pixels
+    """
+    try:
+        from PIL import Image, ImageDraw, ImageFont
+    except ImportError:
+        raise TransformError("The watermark transform requires Pillow (pip install Pillow)")
+
+    text = options.get('text', '')
+    opacity = int(options.get('opacity', 128))
+    margin = int(options.get('margin', 10))
+
+    with Image.open(input_path) as image:
+        image = image.convert('RGBA')
+        overlay = Image.new('RGBA', image.size, (255, 255, 255, 0))
+        draw = ImageDraw.Draw(overlay)
+        font = ImageFont.load_default()
+        left, top, right, bottom = draw.textbbox((0, 0), text, font=font)
+        position = (
+            image.width - (right - left) - margin,
+            image.height - (bottom - top) - margin
+        )
+        draw.text(position, text, font=font, fill=(255, 255, 255, opacity))
+        Image.alpha_composite(image, overlay).convert('RGB').save(output_path, 'JPEG', quality=90)
+
+# Transforms available to routes, by name
+TRANSFORMS: Dict[str, Callable[[str, str, Dict[str, Any]], None]] = {
+    'watermark': watermark,
+}
+
+def run_transform(name: str, input_path: str, output_path: str, options: Dict[str, Any]) -> None:
+    """
+    Run a named transform. Entry point for the worker processes.
+
+    Args:
+        name: Name of the transform
+        input_path: Path to the original file
+        output_path: Path to write the result to
+        options: Options of the transform
+    """
+    if name not in TRANSFORMS:
+        raise TransformError(f"Unknown transform: {name}")
+    TRANSFORMS[name](input_path, output_path, options)
@@ -0,0 +1,59 @@
+"""
+Runtime metrics for the Telegram bot.
+Handles counters and gauges shared between the bot and the health endpoint.
+"""
+
+import threading
+from typing import Any, Dict
+
+class Metrics:
+    """Thread-safe registry of named counters and gauges."""
+
+    def __init__(self):
+        """Initialize an empty registry."""
+        self._lock = threading.Lock()
+        self._values: Dict[str, Any] = {}
+
+    def set(self, name: str, value: Any) -> None:
+        """
+        Set a gauge.
+
+        Args:
+            name: Metric name
+            value: New value
+        """
+        with self._lock:
+            self._values[name] = value
+
+    def inc(self, name: str, amount: int = 1) -> None:
+        """
+        Increment a counter.
+
+        Args:
+            name: Metric name
+            amount: Amount to add
+        """
+        with self._lock:
+            self._values[name] = self._values.get(name, 0) + amount
+
+    def get(self, name: str, default: Any = None) -> Any:
+        """
+        Get a metric value.
+
+        Args:
+            name: Metric name
+            default: Default value if the metric was never set
+
+        Returns:
+            The metric value or default
+        """
+        with self._lock:
+            return self._values.get(name, default)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Get a copy of all metrics."""
+        with self._lock:
+            return dict(self._values)
+
+# Create global metrics instance
+metrics = Metrics()
@@ -0,0 +1,223 @@
+"""
+Event loop monitoring for the Telegram bot.
+Handles loop lag measurement, blocking code detection and the health endpoint.
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import logging
+import threading
+import traceback
+from typing import Any, Callable, Dict, Optional
+
+from telegram.ext import Application
+
+from .metrics import metrics
+from .scheduler import PriorityUpdateProcessor
+from .poller import AdaptivePoller, queue_depth
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+class LoopMonitor:
+    """Measures event loop scheduling delay and reports code that blocks the loop."""
+
+    def __init__(self, interval: float = 0.1, threshold: float = 0.5):
+        """
+        Initialize the loop monitor.
+
+        Args:
+            interval: Seconds between lag measurements
+            threshold: Lag in seconds above which the loop counts as blocked
+        """
+        self.interval = interval
+        self.threshold = threshold
+        self.lag = 0.0
+        self.max_lag = 0.0
+        self.stalls = 0
+        self._heartbeat = time.monotonic()
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    def start(self) -> None:
+        """Start measuring the running loop and watching it from a separate thread."""
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stopped.clear()
+        self._task = asyncio.create_task(self._measure())
+        self._watchdog = threading.Thread(target=self._watch, name='loop-watchdog', daemon=True)
+        self._watchdog.start()
+
+    async def stop(self) -> None:
+        """Stop measuring and watching the loop."""
+        self._stopped.set()
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    @property
+    def heartbeat_age(self) -> float:
+        """Seconds since the loop last ran the measurement task."""
+        return time.monotonic() - self._heartbeat
+
+    @property
+    def responsive(self) -> bool:
+        """Whether the loop ran the measurement task recently enough."""
+        return self.heartbeat_age < self.threshold + self.interval
+
+    async def _measure(self) -> None:
+        """Measure how late the loop wakes up after each sleep."""
+        while True:
+            started = time.monotonic()
+            await asyncio.sleep(self.interval)
+            self._heartbeat = time.monotonic()
+            self.lag = max(0.0, self._heartbeat - started - self.interval)
+            self.max_lag = max(self.max_lag, self.lag)
+            if self.lag > self.threshold:
+                logger.warning(f"Event loop was blocked for {self.lag:.3f}s")
+
+    def _watch(self) -> None:
+        """Log the stack of the loop thread while it is blocked."""
+        reported = False
+        while not self._stopped.wait(self.interval):
+            if self.responsive:
+                reported = False
+                continue
+            if reported:
+                continue
+
+            reported = True
+            self.stalls += 1
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = ''.join(traceback.format_stack(frame)) if frame else 'unavailable'
+            logger.warning(
+                f"Event loop blocked for {self.heartbeat_age:.3f}s, "
+                f"loop thread stack:\n{stack}"
+            )
+
+    def stats(self) -> Dict[str, Any]:
+        """Get the current lag measurements."""
+        return {
+            'loop_lag': round(self.lag, 4),
+            'loop_max_lag': round(self.max_lag, 4),
+            'loop_heartbeat_age': round(self.heartbeat_age, 4),
+            'loop_stalls': self.stalls,
+        }
+
+def health_report(
+    application: Application,
+    monitor: LoopMonitor,
+    poller: Optional[AdaptivePoller] = None
+) -> Dict[str, Any]:
+    """
+    Build the health report of the bot.
+
+    Safe to call from outside the event loop thread.
+
+    Args:
+        application: The bot application
+        monitor: The loop monitor
+        poller: The poller feeding the application, None if not started yet
+
+    Returns:
+        Dict[str, Any]: Loop lag, queue depth, lane counters and metrics
+    """
+    report = monitor.stats()
+    processor = application.update_processor
+    if isinstance(processor, PriorityUpdateProcessor):
+        report['lanes'] = processor.scheduler.stats()
+    report['queue_depth'] = queue_depth(application)
+    report['running'] = application.running
+    report['polling'] = poller is not None and poller.running
+    report.update(metrics.snapshot())
+    return report
+
+class HealthServer:
+    """Serves liveness and readiness checks from a separate thread."""
+
+    def __init__(self, port: int, application: Application, monitor: LoopMonitor):
+        """
+        Initialize the health server.
+
+        Args:
+            port: Port to listen on
+            application: The bot application
+            monitor: The loop monitor
+        """
+        self.port = port
+        self.application = application
+        self.monitor = monitor
+        self.poller: Optional[AdaptivePoller] = None
+        self._server = None
+
+    def _make_handler(self) -> Callable[..., Any]:
+        """Create the request handler class bound to this server."""
+        from http.server import BaseHTTPRequestHandler
+
+        server = self
+
+        class HealthHandler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                report = health_report(server.application, server.monitor, server.poller)
+                responsive = server.monitor.responsive
+                if self.path == '/healthz':
+                    healthy = responsive
+                elif self.path == '/readyz':
+                    healthy = responsive and report['running'] and report['polling']
+                else:
+                    self.send_error(404)
+                    return
+
+                body = json.dumps(report).encode('utf-8')
+                self.send_response(200 if healthy else 503)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args: Any) -> None:
+                logger.debug(format % args)
+
+        return HealthHandler
+
+    def start(self) -> None:
+        """Start serving in a daemon thread."""
+        from http.server import ThreadingHTTPServer
+
+        self._server = ThreadingHTTPServer(('0.0.0.0', self.port), self._make_handler())
+        threading.Thread(
+            target=self._server.serve_forever,
+            name='health-server',
+            daemon=True
+        ).start()
+        logger.info(f"Health endpoint listening on port {self.port}")
+
+    async def stop(self) -> None:
+        """Stop serving without blocking the event loop."""
+        if self._server:
+            await asyncio.get_running_loop().run_in_executor(None, self._server.shutdown)
+            self._server.server_close()
+            self._server = None
+
+def create_monitor() -> LoopMonitor:
+    """Create the loop monitor configured from environment variables."""
+    return LoopMonitor(
+        interval=float(os.getenv('LOOP_LAG_INTERVAL', '0.1')),
+        threshold=float(os.getenv('LOOP_LAG_THRESHOLD', '0.5'))
+    )
+
+def create_health_server(application: Application, monitor: LoopMonitor) -> Optional[HealthServer]:
+    """Create the health server if HEALTH_PORT is set in the environment."""
+    port = os.getenv('HEALTH_PORT')
+    if not port:
+        return None
+    return HealthServer(int(port), application, monitor)
@@ -0,0 +1,346 @@
+"""
+Update polling for the Telegram bot.
+Handles fetching updates with getUpdates, adapting to the backlog and applying backpressure.
+"""
+
+import os
+import asyncio
+import logging
+import time
+from typing import List, Optional
+
+from telegram import Update
+from telegram.error import Conflict, TelegramError, TimedOut, NetworkError, RetryAfter
+from telegram.ext import Application
+
+from .metrics import metrics
+from .state import warm_state
+from .scheduler import BULK, PriorityUpdateProcessor, classify_update
+from .spill import spill_file
+from .recorder import skip_recording
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Seconds between bulk lane checks for requeueing spilled updates
+REQUEUE_INTERVAL = 0.1
+
+def queue_depth(application: Application, lane_name: Optional[str] = None) -> int:
+    """
+    Get the number of received updates that wait to be processed.
+
+    Args:
+        application: The bot application
+        lane_name: Only count updates waiting in this scheduler lane, None for all lanes
+
+    Returns:
+        int: Updates in the update queue and waiting in the scheduler lanes
+    """
+    depth = application.update_queue.qsize()
+    processor = application.update_processor
+    if isinstance(processor, PriorityUpdateProcessor):
+        depth += processor.queued_count(lane_name)
+    return depth
+
+class AdaptivePoller:
+    """
+    Fetches updates with parameters adapted to the backlog.
+
+    Fetching goes on while the bulk lane is full, so commands are still
+    received: forwarding updates are spilled to the spill file, and a second
+    task requeues them in order once the lane has room again. Only when the
+    spill file is full does fetching pause.
+    """
+
+    def __init__(
+        self,
+        application: Application,
+        high_water: int = 500,
+        low_water: int = 100,
+        max_limit: int = 100,
+        idle_timeout: int = 30
+    ):
+        """
+        Initialize the poller.
+
+        Args:
+            application: The bot application to feed
+            high_water: Bulk queue depth at which forwarding updates are spilled
+            low_water: Bulk queue depth at which spilled updates are requeued
+            max_limit: Maximum number of updates per getUpdates call (Telegram allows 100)
+            idle_timeout: Long-poll timeout in seconds when there is no backlog
+        """
+        self.application = application
+        self.high_water = high_water
+        self.low_water = low_water
+        self.max_limit = max_limit
+        self.idle_timeout = idle_timeout
+        self.offset: Optional[int] = None
+        self.spilling = False
+        self.paused = False
+        self._backlog = False
+        self._latency_avg = 0.0
+        self._batch_avg = 0.0
+        self._task: Optional[asyncio.Task] = None
+        self._requeue_task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        """Whether the poller is fetching updates."""
+        return self._task is not None and not self._task.done()
+
+    async def start(self, drop_pending_updates: bool = False) -> None:
+        """
+        Start fetching updates from the warm state offset.
+
+        Args:
+            drop_pending_updates: Whether to drop updates that arrived while the bot was down
+        """
+        # On warm starts the webhook is only removed if getUpdates reports one,
+        # saving a round trip before the first update
+        if drop_pending_updates:
+            await self.application.bot.delete_webhook(drop_pending_updates=True)
+        self.offset = warm_state.update_offset
+        self._task = asyncio.create_task(self._poll())
+        self._requeue_task = asyncio.create_task(self._requeue())
+        logger.info("Polling for updates...")
+
+    async def stop(self) -> None:
+        """Stop fetching updates and confirm the fetched ones to Telegram."""
+        if not self._task:
+            return
+        tasks = [self._task, self._requeue_task]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._task = None
+        self._requeue_task = None
+
+        # Mark everything fetched as read so it is not delivered again
+        if self.offset is not None:
+            token = skip_recording.set(True)
+            try:
+                await self.application.bot.get_updates(offset=self.offset, limit=1, timeout=0)
+            except TelegramError as e:
+                logger.error(f"Error confirming fetched updates: {str(e)}")
+            finally:
+                skip_recording.reset(token)
+
+    def _apply_backpressure(self, depth: int) -> bool:
+        """
+        Start or stop spilling forwarding updates based on the bulk queue depth.
+
+        Args:
+            depth: Current bulk queue depth
+
+        Returns:
+            bool: True if forwarding updates are spilled, False otherwise
+        """
+        if not self.spilling and depth >= self.high_water:
+            self.spilling = True
+            metrics.inc('spill_starts')
+            logger.warning(f"Bulk lane full with {depth} updates waiting, spilling forwards")
+        elif self.spilling and depth <= self.low_water:
+            self.spilling = False
+            logger.info(f"Bulk lane down to {depth} updates, requeueing spilled forwards")
+        metrics.set('spilling', self.spilling)
+        return self.spilling
+
+    def _check_spill_limit(self) -> bool:
+        """
+        Pause or resume fetching based on the size of the spill file.
+
+        Returns:
+            bool: True if fetching is paused, False otherwise
+        """
+        if not self.paused and spill_file.full:
+            self.paused = True
+            metrics.inc('poll_pauses')
+            logger.warning(f"Spill file full with {len(spill_file)} updates, pausing polling")
+        elif self.paused and not spill_file.full:
+            self.paused = False
+            logger.info(f"Resuming polling, {len(spill_file)} updates spilled")
+        metrics.set('poll_paused', self.paused)
+        return self.paused
+
+    def _has_spilled(self) -> bool:
+        """Whether updates wait to be requeued."""
+        return bool(warm_state.pending_updates) or len(spill_file) > 0
+
+    async def _refill(self, depth: int) -> None:
+        """
+        Requeue waiting updates, oldest first, while the bulk lane has room.
+
+        Updates left over from the last shutdown go first, then the spilled ones.
+
+        Args:
+            depth: Current bulk queue depth
+        """
+        if self.spilling or not self._has_spilled():
+            return
+
+        room = max(0, self.high_water - depth)
+        batch = warm_state.pending_updates[:room]
+        if batch:
+            del warm_state.pending_updates[:room]
+            # The snapshot is small without them, keep it in step
+            warm_state.save()
+        batch.extend(spill_file.read(room - len(batch)))
+
+        for data in batch:
+            update = Update.de_json(data, self.application.bot)
+            if update:
+                await self.application.update_queue.put(update)
+        if batch and len(batch) >= room:
+            # The lane is full again, requeue the rest in one go at the low-water mark
+            self._apply_backpressure(self.high_water)
+
+        metrics.set('spilled_updates', len(spill_file))
+        if batch:
+            logger.info(f"Requeued {len(batch)} spilled updates, {len(spill_file)} left")
+
+    async def _enqueue(self, updates: List[Update]) -> None:
+        """
+        Put fetched updates in the update queue or spill them.
+
+        Forwarding updates are spilled while the bulk lane is full, and behind
+        earlier spilled ones so that forwards keep their order. Spilled
+        updates are on disk before the next fetch confirms them to Telegram.
+
+        Args:
+            updates: The fetched updates
+        """
+        depth = queue_depth(self.application, BULK)
+        spilled = []
+        for update in updates:
+            if classify_update(update) == BULK:
+                if self._apply_backpressure(depth) or self._has_spilled() or spilled:
+                    spilled.append(update.to_dict())
+                    continue
+                depth += 1
+            await self.application.update_queue.put(update)
+
+        if spilled:
+            spill_file.append(spilled)
+            metrics.inc('spilled', len(spilled))
+            metrics.set('spilled_updates', len(spill_file))
+
+    async def _fetch(self, depth: int) -> None:
+        """
+        Fetch one batch of updates and queue or spill it.
+
+        Args:
+            depth: Current bulk queue depth
+        """
+        # Never fetch more than fits below the high-water mark, unless the
+        # forwards are spilled anyway
+        room = self.high_water - depth
+        if self.spilling or self._has_spilled():
+            limit = self.max_limit
+        else:
+            limit = max(1, min(self.max_limit, room))
+
+        # Skip the long poll while Telegram still has a backlog for us
+        timeout = 0 if self._backlog else self.idle_timeout
+
+        started = time.monotonic()
+        updates = await self.application.bot.get_updates(
+            offset=self.offset,
+            limit=limit,
+            timeout=timeout,
+            read_timeout=timeout + 10,
+            allowed_updates=Update.ALL_TYPES
+        )
+        latency = time.monotonic() - started
+
+        await self._enqueue(updates)
+        if not self.spilling and len(updates) >= room:
+            # Handlers free slots one by one, fetching for each would
+            # cost a round trip per update
+            self._apply_backpressure(self.high_water)
+        if updates:
+            self.offset = updates[-1].update_id + 1
+            warm_state.track_update(updates[-1].update_id)
+        self._backlog = len(updates) >= limit
+
+        self._latency_avg = 0.9 * self._latency_avg + 0.1 * latency
+        self._batch_avg = 0.9 * self._batch_avg + 0.1 * len(updates)
+        metrics.inc('polls')
+        metrics.inc('polled_updates', len(updates))
+        metrics.set('poll_limit', limit)
+        metrics.set('poll_timeout', timeout)
+        metrics.set('poll_latency', round(latency, 4))
+        metrics.set('poll_latency_avg', round(self._latency_avg, 4))
+        metrics.set('poll_batch_size', len(updates))
+        metrics.set('poll_batch_avg', round(self._batch_avg, 2))
+
+    async def _poll(self) -> None:
+        """Fetch updates until cancelled, backing off on errors."""
+        backoff = 1.0
+        while True:
+            try:
+                if self._check_spill_limit():
+                    await asyncio.sleep(REQUEUE_INTERVAL)
+                    continue
+                await self._fetch(queue_depth(self.application, BULK))
+                backoff = 1.0
+            except Conflict as e:
+                logger.warning(f"Conflict while polling: {str(e)}, removing webhook")
+                metrics.inc('poll_errors')
+                try:
+                    await self.application.bot.delete_webhook()
+                except TelegramError as webhook_error:
+                    logger.error(f"Error removing webhook: {str(webhook_error)}")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 30.0)
+            except RetryAfter as e:
+                logger.warning(f"Flood control while polling, retrying in {e.retry_after}s")
+                await asyncio.sleep(e.retry_after)
+            except (TimedOut, NetworkError) as e:
+                logger.warning(f"Network error while polling: {str(e)}, retrying in {backoff:.0f}s")
+                metrics.inc('poll_errors')
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 30.0)
+            except TelegramError as e:
+                logger.error(f"Error while polling: {str(e)}, retrying in {backoff:.0f}s")
+                metrics.inc('poll_errors')
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 30.0)
+            except Exception as e:
+                # Keep polling, a dead poll task would leave the bot silently deaf
+                logger.error(f"Unexpected error while polling: {str(e)}, retrying in {backoff:.0f}s")
+                metrics.inc('poll_errors')
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 30.0)
+
+    async def _requeue(self) -> None:
+        """Requeue spilled updates until cancelled, independent of long polls."""
+        while True:
+            try:
+                depth = queue_depth(self.application, BULK)
+                self._apply_backpressure(depth)
+                await self._refill(depth)
+            except Exception as e:
+                logger.error(f"Error requeueing spilled updates: {str(e)}")
+            await asyncio.sleep(REQUEUE_INTERVAL)
+
+def create_poller(application: Application) -> AdaptivePoller:
+    """Create the poller configured from environment variables."""
+    poller = AdaptivePoller(
+        application,
+        high_water=int(os.getenv('POLL_HIGH_WATER', '500')),
+        low_water=int(os.getenv('POLL_LOW_WATER', '100')),
+        idle_timeout=int(os.getenv('POLL_TIMEOUT', '30'))
+    )
+
+    # The bulk lane sheds updates beyond its limit, which must leave room
+    # for everything the poller queues before it starts spilling
+    processor = application.update_processor
+    if isinstance(processor, PriorityUpdateProcessor):
+        limit = processor.scheduler.lanes[BULK].max_queue
+        if limit is not None and limit < poller.high_water:
+            logger.warning(
+                f"BULK_QUEUE_LIMIT ({limit}) is below POLL_HIGH_WATER ({poller.high_water}), "
+                "forwards will be shed instead of spilled"
+            )
+    return poller
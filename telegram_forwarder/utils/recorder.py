@@ -0,0 +1,148 @@
+"""
+Update recording for the Telegram bot.
+Handles appending raw getUpdates traffic to a compressed JSONL file for later replay.
+"""
+
+import os
+import gzip
+import json
+import time
+import logging
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, Optional, Tuple
+from pathlib import Path
+
+from telegram.request import BaseRequest, RequestData
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Set while getUpdates is only called to confirm updates that were already
+# recorded, so they are not recorded twice
+skip_recording: ContextVar[bool] = ContextVar('skip_recording', default=False)
+
+class UpdateRecorder:
+    """Appends received updates with their receive timestamps to a gzipped JSONL file."""
+
+    def __init__(self, record_file: str):
+        """
+        Initialize the recorder.
+
+        Args:
+            record_file: Path to the recording, opened in append mode
+        """
+        self.record_file = Path(record_file)
+        self._file = None
+        self.recorded = 0
+
+    def open(self) -> None:
+        """Open the recording for appending."""
+        if self._file is None:
+            self._file = gzip.open(self.record_file, 'at', encoding='utf-8')
+            logger.info(f"Recording updates to {self.record_file}")
+
+    def write(self, updates: list, received_at: float) -> None:
+        """
+        Append a batch of raw updates.
+
+        Args:
+            updates: The raw update dicts as returned by getUpdates
+            received_at: Unix time the batch was received
+        """
+        if self._file is None or not updates:
+            return
+        try:
+            for update in updates:
+                self._file.write(json.dumps({'received_at': received_at, 'update': update}))
+                self._file.write('\n')
+            self._file.flush()
+            self.recorded += len(updates)
+        except Exception as e:
+            logger.error(f"Error recording updates: {str(e)}")
+
+    def close(self) -> None:
+        """Close the recording."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            logger.info(f"Recorded {self.recorded} updates to {self.record_file}")
+
+def read_recording(record_file: str) -> Iterator[Tuple[float, Dict[str, Any]]]:
+    """
+    Read a recording written by UpdateRecorder.
+
+    Args:
+        record_file: Path to the recording
+
+    Yields:
+        Tuple[float, Dict[str, Any]]: The receive timestamp and the raw update
+    """
+    with gzip.open(record_file, 'rt', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                yield record['received_at'], record['update']
+
+class RecordingRequest(BaseRequest):
+    """Request wrapper that records the updates returned by getUpdates."""
+
+    def __init__(self, request: BaseRequest, recorder: UpdateRecorder):
+        """
+        Initialize the request wrapper.
+
+        Args:
+            request: The request used to talk to the Bot API
+            recorder: The recorder to write updates to
+        """
+        self._request = request
+        self.recorder = recorder
+
+    @property
+    def read_timeout(self) -> Optional[float]:
+        """The default read timeout of the wrapped request."""
+        return self._request.read_timeout
+
+    async def initialize(self) -> None:
+        """Initialize the wrapped request and open the recording."""
+        await self._request.initialize()
+        self.recorder.open()
+
+    async def shutdown(self) -> None:
+        """Shut down the wrapped request and close the recording."""
+        await self._request.shutdown()
+        self.recorder.close()
+
+    async def do_request(
+        self,
+        url: str,
+        method: str,
+        request_data: Optional[RequestData] = None,
+        read_timeout=BaseRequest.DEFAULT_NONE,
+        write_timeout=BaseRequest.DEFAULT_NONE,
+        connect_timeout=BaseRequest.DEFAULT_NONE,
+        pool_timeout=BaseRequest.DEFAULT_NONE
+    ) -> Tuple[int, bytes]:
+        """Make the request and record the updates in a successful getUpdates response."""
+        code, payload = await self._request.do_request(
+            url,
+            method,
+            request_data=request_data,
+            read_timeout=read_timeout,
+            write_timeout=write_timeout,
+            connect_timeout=connect_timeout,
+            pool_timeout=pool_timeout
+        )
+        if code == 200 and url.endswith('/getUpdates') and not skip_recording.get():
+            received_at = time.time()
+            try:
+                self.recorder.write(json.loads(payload).get('result', []), received_at)
+            except ValueError as e:
+                logger.error(f"Error decoding updates for recording: {str(e)}")
+        return code, payload
+
+def create_recorder() -> Optional[UpdateRecorder]:
+    """Create a recorder if RECORD_UPDATES is set in the environment."""
+    record_file = os.getenv('RECORD_UPDATES')
+    if not record_file:
+        return None
+    return UpdateRecorder(record_file)
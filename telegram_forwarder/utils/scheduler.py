@@ -0,0 +1,291 @@
+"""
+Update scheduling for the Telegram bot.
+Handles priority lanes so that commands stay responsive during forwarding floods.
+"""
+
+import os
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Awaitable, Deque, Dict, List, Optional, Tuple
+
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+INTERACTIVE = 'interactive'
+BULK = 'bulk'
+
+def _close(coroutine: Awaitable[Any]) -> None:
+    """Close a coroutine that will never be awaited."""
+    close = getattr(coroutine, 'close', None)
+    if close:
+        close()
+
+class Lane:
+    """A queue of work sharing the scheduler slots with a given weight."""
+
+    def __init__(
+        self,
+        name: str,
+        weight: int,
+        max_active: Optional[int] = None,
+        max_queue: Optional[int] = None
+    ):
+        """
+        Initialize the lane.
+
+        Args:
+            name: Name of the lane
+            weight: Share of the free slots the lane gets when other lanes are waiting too
+            max_active: Maximum number of items run at once, None for no limit
+            max_queue: Maximum number of waiting items before new ones are shed, None for no limit
+        """
+        self.name = name
+        self.weight = weight
+        self.max_active = max_active
+        self.max_queue = max_queue
+        self.waiters: Deque[Tuple[asyncio.Future, object]] = deque()
+        self.active = 0
+        self.current_weight = 0
+        self.processed = 0
+        self.shed = 0
+
+    def can_start(self) -> bool:
+        """Check if the lane may run another item."""
+        return self.max_active is None or self.active < self.max_active
+
+    def stats(self) -> Dict[str, int]:
+        """Get the current counters of the lane."""
+        return {
+            'active': self.active,
+            'queued': len(self.waiters),
+            'processed': self.processed,
+            'shed': self.shed,
+        }
+
+class PriorityScheduler:
+    """Runs work from several lanes on a fixed number of slots with weighted fair sharing."""
+
+    def __init__(self, slots: int, lanes: List[Lane]):
+        """
+        Initialize the scheduler.
+
+        Args:
+            slots: Maximum number of items run at once across all lanes
+            lanes: The lanes to schedule
+        """
+        self.slots = slots
+        self.lanes: Dict[str, Lane] = {lane.name: lane for lane in lanes}
+        self.active = 0
+
+    async def run(self, lane_name: str, coroutine: Awaitable[Any], item: object = None) -> None:
+        """
+        Run a coroutine once its lane gets a slot.
+
+        If the lane's queue is full the coroutine is dropped instead.
+
+        Args:
+            lane_name: Name of the lane to run in
+            coroutine: The coroutine to run
+            item: The item the coroutine processes, reported by queued_items
+        """
+        lane = self.lanes[lane_name]
+
+        if self.active < self.slots and lane.can_start() and not lane.waiters:
+            self._grant(lane)
+        else:
+            if lane.max_queue is not None and len(lane.waiters) >= lane.max_queue:
+                lane.shed += 1
+                if lane.shed % 100 == 1:
+                    logger.warning(f"Lane {lane.name} overloaded, shedding work ({lane.shed} shed)")
+                _close(coroutine)
+                return
+
+            future = asyncio.get_running_loop().create_future()
+            lane.waiters.append((future, item))
+            try:
+                await future
+            except asyncio.CancelledError:
+                if future.cancelled():
+                    try:
+                        lane.waiters.remove((future, item))
+                    except ValueError:
+                        pass
+                    _close(coroutine)
+                else:
+                    # The slot was granted just before cancellation
+                    self._release(lane)
+                raise
+
+        try:
+            await coroutine
+        finally:
+            lane.processed += 1
+            self._release(lane)
+
+    def _grant(self, lane: Lane) -> None:
+        """Take a slot for the lane."""
+        lane.active += 1
+        self.active += 1
+
+    def _release(self, lane: Lane) -> None:
+        """Give back a slot of the lane and hand free slots to waiting work."""
+        lane.active -= 1
+        self.active -= 1
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        """Hand free slots to waiting lanes using smooth weighted round robin."""
+        while self.active < self.slots:
+            candidates = [
+                lane for lane in self.lanes.values()
+                if lane.waiters and lane.can_start()
+            ]
+            if not candidates:
+                return
+
+            total_weight = sum(lane.weight for lane in candidates)
+            for lane in candidates:
+                lane.current_weight += lane.weight
+            chosen = max(candidates, key=lambda lane: lane.current_weight)
+            chosen.current_weight -= total_weight
+
+            future, _ = chosen.waiters.popleft()
+            if future.done():
+                continue
+            self._grant(chosen)
+            future.set_result(None)
+
+    def queued_items(self) -> List[object]:
+        """Get the items still waiting for a slot, in arrival order per lane."""
+        return [item for lane in self.lanes.values() for _, item in lane.waiters]
+
+    def cancel_queued(self) -> None:
+        """Cancel all items waiting for a slot."""
+        for lane in self.lanes.values():
+            while lane.waiters:
+                future, _ = lane.waiters.popleft()
+                future.cancel()
+
+    def queued_count(self, lane_name: Optional[str] = None) -> int:
+        """
+        Get the number of items waiting for a slot.
+
+        Args:
+            lane_name: Only count this lane, None for all lanes
+
+        Returns:
+            int: Number of waiting items
+        """
+        if lane_name is not None:
+            return len(self.lanes[lane_name].waiters)
+        return sum(len(lane.waiters) for lane in self.lanes.values())
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Get the current counters of all lanes."""
+        return {name: lane.stats() for name, lane in self.lanes.items()}
+
+def classify_update(update: object) -> str:
+    """
+    Get the lane an update belongs in.
+
+    Commands, button presses and mentions of the bot (which set the
+    destination channel) are interactive, everything else is bulk.
+
+    Args:
+        update: The update to classify
+
+    Returns:
+        str: The lane name
+    """
+    if not isinstance(update, Update):
+        return INTERACTIVE
+    if update.callback_query:
+        return INTERACTIVE
+
+    message = update.effective_message
+    if message and message.text and message.text.startswith('/'):
+        return INTERACTIVE
+    if update.message and update.message.entities:
+        from ..handlers.messages import is_bot_mentioned
+
+        try:
+            bot = update.get_bot()
+        except RuntimeError:
+            return BULK
+        if is_bot_mentioned(update.message, bot):
+            return INTERACTIVE
+    return BULK
+
+class PriorityUpdateProcessor(BaseUpdateProcessor):
+    """Update processor that runs interactive updates ahead of forwarding work."""
+
+    def __init__(
+        self,
+        slots: int = 4,
+        interactive_weight: int = 4,
+        bulk_weight: int = 1,
+        bulk_concurrency: int = 1,
+        bulk_queue_limit: Optional[int] = 1000
+    ):
+        """
+        Initialize the update processor.
+
+        Args:
+            slots: Maximum number of updates processed at once
+            interactive_weight: Share of the slots for commands and callbacks
+            bulk_weight: Share of the slots for forwarding
+            bulk_concurrency: Maximum number of bulk updates processed at once,
+                1 keeps forwarded posts in order
+            bulk_queue_limit: Maximum number of waiting bulk updates before new ones are shed
+        """
+        # The scheduler enforces the limits, the semaphore only needs to let everything through
+        super().__init__(max_concurrent_updates=2 ** 16)
+        self.scheduler = PriorityScheduler(
+            slots=slots,
+            lanes=[
+                Lane(INTERACTIVE, interactive_weight),
+                Lane(BULK, bulk_weight, max_active=bulk_concurrency, max_queue=bulk_queue_limit),
+            ]
+        )
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        """
+        Run the update in its lane.
+
+        Args:
+            update: The update to be processed
+            coroutine: The coroutine that processes the update
+        """
+        await self.scheduler.run(classify_update(update), coroutine, update)
+
+    async def initialize(self) -> None:
+        """Nothing to set up."""
+
+    async def shutdown(self) -> None:
+        """Nothing to clean up."""
+
+    def queued_updates(self) -> List[object]:
+        """Get the updates still waiting for a slot."""
+        return self.scheduler.queued_items()
+
+    def queued_count(self, lane_name: Optional[str] = None) -> int:
+        """Get the number of updates waiting for a slot, optionally in one lane only."""
+        return self.scheduler.queued_count(lane_name)
+
+    def cancel_queued(self) -> None:
+        """Cancel the updates waiting for a slot."""
+        self.scheduler.cancel_queued()
+
+def create_update_processor() -> PriorityUpdateProcessor:
+    """Create the update processor configured from environment variables."""
+    return PriorityUpdateProcessor(
+        slots=int(os.getenv('UPDATE_SLOTS', '4')),
+        interactive_weight=int(os.getenv('INTERACTIVE_WEIGHT', '4')),
+        bulk_weight=int(os.getenv('BULK_WEIGHT', '1')),
+        bulk_concurrency=int(os.getenv('BULK_CONCURRENCY', '1')),
+        bulk_queue_limit=int(os.getenv('BULK_QUEUE_LIMIT', '1000'))
+    )
@@ -0,0 +1,157 @@
+"""
+Update spilling for the Telegram bot.
+Handles an append-only file of forwarding updates that wait for room in the bulk lane.
+"""
+
+import os
+import json
+import logging
+from typing import Any, Dict, IO, List, Optional
+from pathlib import Path
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+class SpillFile:
+    """
+    Append-only JSONL file of spilled updates, read back oldest first.
+
+    Updates are written as they are spilled, so they survive crashes. The
+    read position is kept in a small file next to it, and the file is
+    truncated once everything was read.
+    """
+
+    def __init__(self, path: str = 'spill.jsonl', limit: Optional[int] = 100000):
+        """
+        Initialize the spill file. Nothing is read until load is called.
+
+        Args:
+            path: Path to the spill file
+            limit: Number of unread updates at which the spill counts as full, None for no limit
+        """
+        self.path = Path(path)
+        self.limit = limit
+        self._count = 0
+        self._position = 0
+        self._writer: Optional[IO[str]] = None
+
+    @property
+    def position_file(self) -> Path:
+        """Path to the file holding the read position."""
+        return self.path.with_name(self.path.name + '.pos')
+
+    def __len__(self) -> int:
+        """Get the number of unread updates."""
+        return self._count
+
+    @property
+    def full(self) -> bool:
+        """Whether the number of unread updates reached the limit."""
+        return self.limit is not None and self._count >= self.limit
+
+    def load(self) -> None:
+        """Count the updates left unread by the last run."""
+        self.close()
+        self._count = 0
+        self._position = 0
+        try:
+            if self.position_file.exists():
+                self._position = int(self.position_file.read_text() or 0)
+            if not self.path.exists():
+                return
+            with open(self.path, 'r') as f:
+                f.seek(self._position)
+                self._count = sum(1 for line in f if line.strip())
+        except Exception as e:
+            logger.error(f"Error loading spilled updates: {str(e)}")
+            return
+
+        if self._count:
+            logger.info(f"{self._count} spilled updates left from last run")
+
+    def append(self, updates: List[Dict[str, Any]]) -> None:
+        """
+        Write updates to the end of the file.
+
+        Args:
+            updates: The serialized updates
+        """
+        if self._writer is None:
+            self._writer = open(self.path, 'a')
+        for update in updates:
+            self._writer.write(json.dumps(update) + '\n')
+        self._writer.flush()
+        self._count += len(updates)
+
+    def read(self, count: int) -> List[Dict[str, Any]]:
+        """
+        Take the oldest unread updates.
+
+        Args:
+            count: Maximum number of updates to take
+
+        Returns:
+            List[Dict[str, Any]]: The serialized updates, oldest first
+        """
+        if not self._count or count <= 0:
+            return []
+
+        updates = []
+        with open(self.path, 'r') as f:
+            f.seek(self._position)
+            while len(updates) < count:
+                line = f.readline()
+                if not line:
+                    break
+                try:
+                    updates.append(json.loads(line))
+                except ValueError:
+                    # A line cut short by a crash
+                    logger.warning("Skipping unreadable spilled update")
+            self._position = f.tell()
+
+        self._count = max(0, self._count - len(updates))
+        if not line or not self._count:
+            self._reset()
+        else:
+            self._save_position()
+        return updates
+
+    def _save_position(self) -> None:
+        """Write the read position atomically."""
+        tmp_file = self.position_file.with_name(self.position_file.name + '.tmp')
+        try:
+            tmp_file.write_text(str(self._position))
+            os.replace(tmp_file, self.position_file)
+        except Exception as e:
+            logger.error(f"Error saving spill position: {str(e)}")
+
+    def _reset(self) -> None:
+        """Remove the file once everything was read."""
+        self.close()
+        self._count = 0
+        self._position = 0
+        for path in (self.path, self.position_file):
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                logger.error(f"Error removing {path}: {str(e)}")
+
+    def close(self) -> None:
+        """Close the file handle used for appending."""
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+def create_spill_file() -> SpillFile:
+    """Create the spill file configured from environment variables."""
+    limit = int(os.getenv('SPILL_LIMIT', '100000'))
+    return SpillFile(
+        path=os.getenv('SPILL_FILE', 'spill.jsonl'),
+        limit=limit or None
+    )
+
+# Create global spill file instance
+spill_file = create_spill_file()
@@ -0,0 +1,248 @@
+"""
+Warm state management for the Telegram bot.
+Handles snapshotting of runtime caches so that restarts start hot.
+"""
+
+import os
+import json
+import time
+import logging
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional
+from pathlib import Path
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+class WarmState:
+    """Holds runtime state that survives restarts via a snapshot file."""
+
+    def __init__(
+        self,
+        state_file: str = 'state.json',
+        dedup_size: int = 1000,
+        transform_cache_size: int = 1000,
+        chat_cache_ttl: float = 300.0
+    ):
+        """
+        Initialize the warm state.
+
+        Args:
+            state_file: Path to the snapshot file
+            dedup_size: Number of recently forwarded messages to remember
+            transform_cache_size: Number of transformed media files to remember
+            chat_cache_ttl: Seconds a cached chat title is used before it is looked up again
+        """
+        self.state_file = Path(state_file)
+        self.dedup_size = dedup_size
+        self.transform_cache_size = transform_cache_size
+        self.chat_cache_ttl = chat_cache_ttl
+        self.chat_cache: Dict[str, Dict[str, Any]] = {}
+        self.update_offset: Optional[int] = None
+        self.pending_updates: List[Dict[str, Any]] = []
+        self._pending_forwards: Dict[str, Dict[str, Any]] = {}
+        self._forwarded: "OrderedDict[str, None]" = OrderedDict()
+        self._transformed: "OrderedDict[str, str]" = OrderedDict()
+
+    @staticmethod
+    def _forward_key(from_chat_id: int, message_id: int) -> str:
+        """Build the dedup key for a source message."""
+        return f"{from_chat_id}:{message_id}"
+
+    def load(self) -> None:
+        """Load the snapshot from file, starting cold if it is missing or invalid."""
+        try:
+            if not self.state_file.exists():
+                logger.info("No warm state found, starting cold")
+                return
+            with open(self.state_file, 'r') as f:
+                data = json.load(f)
+        except Exception as e:
+            logger.error(f"Error loading warm state: {str(e)}")
+            return
+
+        self.chat_cache = data.get('chat_cache', {})
+        self.update_offset = data.get('update_offset')
+        self.pending_updates = data.get('pending_updates', [])
+        self._pending_forwards = {
+            self._forward_key(item['from_chat_id'], item['message_id']): item
+            for item in data.get('pending_forwards', [])
+        }
+        self._forwarded = OrderedDict(
+            (key, None) for key in data.get('forwarded', [])[-self.dedup_size:]
+        )
+        self._transformed = OrderedDict(
+            list(data.get('transformed', {}).items())[-self.transform_cache_size:]
+        )
+        logger.info(
+            f"Warm state loaded: {len(self.chat_cache)} chats, "
+            f"{len(self._forwarded)} recent forwards, "
+            f"{len(self._transformed)} transformed files, "
+            f"{len(self._pending_forwards)} pending forwards, "
+            f"{len(self.pending_updates)} pending updates"
+        )
+
+    def save(self) -> None:
+        """Write the snapshot to file atomically."""
+        data = {
+            'chat_cache': self.chat_cache,
+            'update_offset': self.update_offset,
+            'pending_updates': self.pending_updates,
+            'pending_forwards': list(self._pending_forwards.values()),
+            'forwarded': list(self._forwarded),
+            'transformed': self._transformed,
+        }
+        tmp_file = self.state_file.with_name(self.state_file.name + '.tmp')
+        try:
+            with open(tmp_file, 'w') as f:
+                json.dump(data, f)
+            os.replace(tmp_file, self.state_file)
+        except Exception as e:
+            logger.error(f"Error saving warm state: {str(e)}")
+
+    def get_chat_title(self, chat_id: int) -> Optional[str]:
+        """
+        Get the cached title of a chat.
+
+        Args:
+            chat_id: The chat ID
+
+        Returns:
+            Optional[str]: The title, None if it is not cached or older than the TTL
+        """
+        cached = self.chat_cache.get(str(chat_id))
+        if not cached or time.time() - cached.get('cached_at', 0) > self.chat_cache_ttl:
+            return None
+        return cached['title']
+
+    def cache_chat_title(self, chat_id: int, title: Optional[str]) -> None:
+        """
+        Remember the title of a chat.
+
+        Args:
+            chat_id: The chat ID
+            title: The title as reported by Telegram
+        """
+        self.chat_cache[str(chat_id)] = {'title': title, 'cached_at': time.time()}
+
+    def forget_chat(self, chat_id: int) -> None:
+        """
+        Drop the cached title of a chat, e.g. after the bot lost access to it.
+
+        Args:
+            chat_id: The chat ID
+        """
+        self.chat_cache.pop(str(chat_id), None)
+
+    def track_update(self, update_id: int) -> None:
+        """
+        Advance the update offset past the given update.
+
+        Args:
+            update_id: ID of an update that was received
+        """
+        if self.update_offset is None or update_id >= self.update_offset:
+            self.update_offset = update_id + 1
+
+    def is_forwarded(self, from_chat_id: int, message_id: int) -> bool:
+        """
+        Check if a message was already forwarded recently.
+
+        Args:
+            from_chat_id: The source chat ID
+            message_id: The source message ID
+
+        Returns:
+            bool: True if the message is in the dedup window, False otherwise
+        """
+        return self._forward_key(from_chat_id, message_id) in self._forwarded
+
+    def begin_forward(
+        self,
+        chat_id: int,
+        from_chat_id: int,
+        message_id: int,
+        message: Optional[Dict[str, Any]] = None
+    ) -> None:
+        """
+        Register a forward as in flight.
+
+        Args:
+            chat_id: The destination chat ID
+            from_chat_id: The source chat ID
+            message_id: The source message ID
+            message: The source message, if it is needed to resend the forward
+        """
+        forward = {
+            'chat_id': chat_id,
+            'from_chat_id': from_chat_id,
+            'message_id': message_id,
+        }
+        if message is not None:
+            forward['message'] = message
+        self._pending_forwards[self._forward_key(from_chat_id, message_id)] = forward
+
+    def complete_forward(self, from_chat_id: int, message_id: int) -> None:
+        """
+        Mark an in-flight forward as done and remember it in the dedup window.
+
+        Args:
+            from_chat_id: The source chat ID
+            message_id: The source message ID
+        """
+        key = self._forward_key(from_chat_id, message_id)
+        self._pending_forwards.pop(key, None)
+        self._forwarded[key] = None
+        self._forwarded.move_to_end(key)
+        while len(self._forwarded) > self.dedup_size:
+            self._forwarded.popitem(last=False)
+
+    def abandon_forward(self, from_chat_id: int, message_id: int) -> None:
+        """
+        Drop an in-flight forward that failed and should not be retried.
+
+        Args:
+            from_chat_id: The source chat ID
+            message_id: The source message ID
+        """
+        self._pending_forwards.pop(self._forward_key(from_chat_id, message_id), None)
+
+    def get_transformed(self, key: str) -> Optional[str]:
+        """
+        Get the file ID of an already transformed media file.
+
+        Args:
+            key: The original file's unique ID combined with the transform
+
+        Returns:
+            Optional[str]: The file ID of the uploaded result, None if not cached
+        """
+        file_id = self._transformed.get(key)
+        if file_id is not None:
+            self._transformed.move_to_end(key)
+        return file_id
+
+    def set_transformed(self, key: str, file_id: str) -> None:
+        """
+        Remember the file ID of a transformed media file.
+
+        Args:
+            key: The original file's unique ID combined with the transform
+            file_id: The file ID of the uploaded result
+        """
+        self._transformed[key] = file_id
+        self._transformed.move_to_end(key)
+        while len(self._transformed) > self.transform_cache_size:
+            self._transformed.popitem(last=False)
+
+    def pending_forwards(self) -> List[Dict[str, Any]]:
+        """Get the forwards that were started but not completed."""
+        return list(self._pending_forwards.values())
+
+# Create global warm state instance
+warm_state = WarmState(
+    state_file=os.getenv('STATE_FILE', 'state.json'),
+    dedup_size=int(os.getenv('DEDUP_WINDOW', '1000')),
+    transform_cache_size=int(os.getenv('TRANSFORM_CACHE_SIZE', '1000')),
+    chat_cache_ttl=float(os.getenv('CHAT_CACHE_TTL', '300'))
+)
@@ -0,0 +1,359 @@
+"""
+Media transformation for the Telegram bot.
+Handles downloading, transforming in a process pool and re-uploading media for selected routes.
+"""
+
+import os
+import json
+import asyncio
+import shutil
+import logging
+import tempfile
+from typing import TYPE_CHECKING, Any, Callable, Dict, Optional, Set, Union
+from pathlib import Path
+
+import httpx
+from telegram import Message
+from telegram.constants import ParseMode
+
+from .config import config
+from .state import warm_state
+from .media import run_transform
+
+if TYPE_CHECKING:
+    from concurrent.futures import ProcessPoolExecutor
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+class TransformRoute:
+    """Transform settings for one destination channel."""
+
+    def __init__(
+        self,
+        transform: Optional[str] = None,
+        options: Optional[Dict[str, Any]] = None,
+        caption_template: Optional[str] = None
+    ):
+        """
+        Initialize the route.
+
+        Args:
+            transform: Name of the media transform, None to only re-encode captions
+            options: Options of the transform
+            caption_template: Template for the new caption, '{caption}' is the
+                original caption as HTML
+        """
+        self.transform = transform
+        self.options = options or {}
+        self.caption_template = caption_template
+
+    @property
+    def key(self) -> str:
+        """Identify the transform and its options for caching."""
+        return json.dumps([self.transform, self.options], sort_keys=True)
+
+    def applies_to(self, message: Message) -> bool:
+        """Check if the route transforms this message."""
+        return bool(message.photo)
+
+    def caption(self, message: Message) -> Optional[str]:
+        """
+        Re-encode the caption of a message as HTML using the template.
+
+        Args:
+            message: The original message
+
+        Returns:
+            Optional[str]: The new caption
+        """
+        caption = message.caption_html if message.caption else ''
+        if self.caption_template:
+            caption = self.caption_template.format(caption=caption)
+        return caption or None
+
+def get_route(chat_id: int) -> Optional[TransformRoute]:
+    """
+    Get the transform route configured for a destination channel.
+
+    Routes are configured in the 'transforms' config entry, keyed by channel ID.
+
+    Args:
+        chat_id: The destination channel ID
+
+    Returns:
+        Optional[TransformRoute]: The route, None if messages are copied as they are
+    """
+    route = config.get('transforms', {}).get(str(chat_id))
+    if not route:
+        return None
+    return TransformRoute(
+        transform=route.get('transform'),
+        options=route.get('options'),
+        caption_template=route.get('caption_template')
+    )
+
+def available_cpus() -> int:
+    """Get the number of CPUs this process may run on, which can be fewer than the host has."""
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+class TransformStage:
+    """
+    Downloads, transforms and re-uploads media, caching the results.
+
+    Copies are pipelined: they are downloaded and transformed concurrently,
+    and only the final sends are serialized, in the order they were queued.
+    """
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        pipeline_size: Optional[int] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None
+    ):
+        """
+        Initialize the stage. The process pool and HTTP client are created on first use.
+
+        Args:
+            max_workers: Number of worker processes, defaults to the available cores
+            pipeline_size: Maximum number of copies queued at once, defaults to
+                twice the workers so downloads overlap transforms
+            transport: HTTP transport for downloads, e.g. a mock for replays
+        """
+        self.max_workers = max_workers or available_cpus()
+        self.pipeline_size = pipeline_size or 2 * self.max_workers
+        self.transport = transport
+        self._pool = None
+        self._client: Optional[httpx.AsyncClient] = None
+        self._pipeline: Optional[asyncio.Semaphore] = None
+        self._last_sends: Dict[int, asyncio.Future] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        self._cancelled = False
+
+    def _get_pool(self) -> "ProcessPoolExecutor":
+        """Get the process pool, creating it if needed."""
+        if self._pool is None:
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+
+            # Forking while the watchdog and health server threads run can
+            # copy a held lock into the workers, so start them fresh
+            if 'forkserver' in multiprocessing.get_all_start_methods():
+                context = multiprocessing.get_context('forkserver')
+                # Workers only need the transforms, not whatever the main module imports
+                context.set_forkserver_preload([run_transform.__module__])
+            else:
+                context = multiprocessing.get_context('spawn')
+            self._pool = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=context)
+            logger.info(f"Started transform pool with {self.max_workers} workers")
+        return self._pool
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """Get the HTTP client used for downloads, creating it if needed."""
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=60.0, transport=self.transport)
+        return self._client
+
+    async def _download(self, bot, file_id: str, path: Path) -> None:
+        """
+        Stream a file from Telegram to disk without holding it in memory.
+
+        Args:
+            bot: The bot instance
+            file_id: The file to download
+            path: Where to write the file
+        """
+        file = await bot.get_file(file_id)
+        async with self._get_client().stream('GET', file.file_path) as response:
+            response.raise_for_status()
+            with open(path, 'wb') as f:
+                async for chunk in response.aiter_bytes(DOWNLOAD_CHUNK_SIZE):
+                    f.write(chunk)
+
+    async def _prepare(self, bot, message: Message, route: TransformRoute, tmp_dir: Path) -> Union[str, Path]:
+        """
+        Get the photo to send for a message, transforming it if needed.
+
+        Args:
+            bot: The bot instance
+            message: The original message
+            route: The transform settings of the destination
+            tmp_dir: Directory for the downloaded and transformed files
+
+        Returns:
+            Union[str, Path]: File ID of the photo to send, or path of the transformed file
+        """
+        photo = message.photo[-1]
+        if not route.transform:
+            return photo.file_id
+
+        cached_file_id = warm_state.get_transformed(f"{photo.file_unique_id}:{route.key}")
+        if cached_file_id:
+            logger.info(f"Message {message.message_id} sent from transform cache")
+            return cached_file_id
+
+        input_path = tmp_dir / 'input'
+        output_path = tmp_dir / 'output.jpg'
+        await self._download(bot, photo.file_id, input_path)
+
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(
+            self._get_pool(),
+            run_transform,
+            route.transform,
+            str(input_path),
+            str(output_path),
+            route.options
+        )
+        return output_path
+
+    async def _send(self, bot, chat_id: int, message: Message, route: TransformRoute, photo: Union[str, Path]) -> None:
+        """
+        Send the prepared copy of a message.
+
+        Args:
+            bot: The bot instance
+            chat_id: The destination chat ID
+            message: The original message
+            route: The transform settings of the destination
+            photo: Result of _prepare
+        """
+        caption = route.caption(message)
+        if not isinstance(photo, Path):
+            await bot.send_photo(chat_id, photo=photo, caption=caption, parse_mode=ParseMode.HTML)
+            return
+
+        # python-telegram-bot reads the file once to build the multipart body
+        with open(photo, 'rb') as f:
+            sent = await bot.send_photo(chat_id, photo=f, caption=caption, parse_mode=ParseMode.HTML)
+        cache_key = f"{message.photo[-1].file_unique_id}:{route.key}"
+        warm_state.set_transformed(cache_key, sent.photo[-1].file_id)
+        logger.info(f"Message {message.message_id} transformed with {route.transform}")
+
+    def _release_send(self, chat_id: int, sent: asyncio.Future) -> None:
+        """Let the next copy to a chat be sent."""
+        if self._last_sends.get(chat_id) is sent:
+            del self._last_sends[chat_id]
+        if not sent.done():
+            sent.set_result(None)
+
+    async def _process(
+        self,
+        bot,
+        chat_id: int,
+        message: Message,
+        route: TransformRoute,
+        previous: Optional[asyncio.Future],
+        sent: asyncio.Future,
+        on_done: Callable[[Optional[Exception]], None]
+    ) -> None:
+        """Prepare a queued copy, then send it once the copy queued before it was sent."""
+        pipeline = self._pipeline
+        tmp_dir = Path(tempfile.mkdtemp(prefix='transform-'))
+        try:
+            photo = await self._prepare(bot, message, route, tmp_dir) if route.applies_to(message) else None
+            if previous is not None:
+                # Shielded, cancelling this copy must not cancel the one before it
+                await asyncio.shield(previous)
+            if photo is None:
+                await bot.copy_message(
+                    chat_id=chat_id,
+                    from_chat_id=message.chat_id,
+                    message_id=message.message_id
+                )
+            else:
+                await self._send(bot, chat_id, message, route, photo)
+        except Exception as e:
+            on_done(e)
+        else:
+            on_done(None)
+        finally:
+            pipeline.release()
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            if previous is not None and not previous.done():
+                # Cancelled while waiting, the copies queued after this one
+                # still wait for the one before it
+                previous.add_done_callback(lambda _: self._release_send(chat_id, sent))
+            else:
+                self._release_send(chat_id, sent)
+
+    async def submit(
+        self,
+        bot,
+        chat_id: int,
+        message: Message,
+        route: TransformRoute,
+        on_done: Callable[[Optional[Exception]], None]
+    ) -> None:
+        """
+        Queue a copy of a message to a chat with a transform route.
+
+        Returns once the copy is queued, waiting while the pipeline is full.
+        Messages the route does not transform are copied as they are, in the
+        same order. After cancel() nothing is queued anymore.
+
+        Args:
+            bot: The bot instance
+            chat_id: The destination chat ID
+            message: The original message
+            route: The transform settings of the destination
+            on_done: Called with None once the copy was sent, or with the error
+        """
+        if self._pipeline is None:
+            self._pipeline = asyncio.Semaphore(self.pipeline_size)
+        await self._pipeline.acquire()
+        if self._cancelled:
+            self._pipeline.release()
+            return
+
+        previous = self._last_sends.get(chat_id)
+        sent = asyncio.get_running_loop().create_future()
+        self._last_sends[chat_id] = sent
+        task = asyncio.create_task(self._process(bot, chat_id, message, route, previous, sent, on_done))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    @property
+    def pending(self) -> int:
+        """Number of copies queued but not yet sent or failed."""
+        return len(self._tasks)
+
+    async def join(self) -> None:
+        """Wait until all queued copies were sent or failed."""
+        while self._tasks:
+            await asyncio.wait(set(self._tasks))
+
+    async def cancel(self) -> None:
+        """Cancel all queued copies and stop queueing new ones. Their forwards stay pending in the warm state."""
+        self._cancelled = True
+        tasks = set(self._tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def shutdown(self) -> None:
+        """Close the HTTP client and stop the worker processes."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        if self._pool is not None:
+            # Waits for running transforms, off the event loop
+            await asyncio.get_running_loop().run_in_executor(None, self._pool.shutdown)
+            self._pool = None
+        self._pipeline = None
+
+def create_transform_stage() -> TransformStage:
+    """Create the transform stage configured from environment variables."""
+    workers = os.getenv('TRANSFORM_WORKERS')
+    pipeline_size = os.getenv('TRANSFORM_PIPELINE')
+    return TransformStage(
+        max_workers=int(workers) if workers else None,
+        pipeline_size=int(pipeline_size) if pipeline_size else None
+    )
+
+# Create global transform stage instance
+transform_stage = create_transform_stage()